@@ -1,12 +1,15 @@
 """The Hark Machine Executable class"""
 
+from bisect import bisect_right
 from dataclasses import dataclass
-from typing import Any, Dict, List
+from functools import cached_property
+from typing import Any, Callable, Dict, List, Tuple
 
 from ..cli import interface as ui
 from . import instructionset
+from .foreign import import_python_function
 from .instruction import Instruction
-from .types import TlType
+from .types import TlForeignPtr, TlInstruction, TlType
 
 
 @dataclass
@@ -18,15 +21,104 @@ class Executable:
     code: List[Instruction]
     attributes: dict
 
+    @cached_property
+    def machine_code(self) -> List[Instruction]:
+        """The code as run by the machine
+
+        This is the compiled code with load-time optimisations applied, and
+        terminated by a Stop sentinel. Instruction positions are unchanged, so
+        IPs (e.g. in stack traces) still refer to self.code.
+        """
+        code = list(self.traced_code)
+        self._fuse_instructions(code)
+        return code
+
+    @cached_property
+    def traced_code(self) -> List[Instruction]:
+        """The code as run by the machine when tracing steps
+
+        Like machine_code, but without super-instructions, so that every
+        instruction in self.code is executed (and traced) individually.
+        """
+        # Any name that's ever bound locally could shadow a global or builtin
+        local_names = {
+            str(i.operands[0]) for i in self.code if isinstance(i, instructionset.Bind)
+        }
+        code = []
+        for instr in self.code:
+            if isinstance(instr, instructionset.PushB):
+                instr = self._resolve_binding(instr, local_names)
+            code.append(instr)
+        code.append(instructionset.Stop())
+        return code
+
+    def _fuse_instructions(self, code: List[Instruction]):
+        """Replace common pairs of instructions with super-instructions
+
+        The second instruction of each pair is left in place (the fused one
+        skips over it), in case anything jumps straight to it.
+        """
+        for idx in range(len(code) - 1):
+            a, b = code[idx], code[idx + 1]
+            if idx + 1 in self.ip_to_name:
+                continue  # b is the start of a different function
+            if isinstance(a, instructionset.Bind) and isinstance(b, instructionset.Pop):
+                code[idx] = instructionset.BindPop(*a.operands, source=a.source)
+            elif (
+                isinstance(a, instructionset.PushV)
+                and isinstance(b, instructionset.Call)
+                and isinstance(a.operands[0], TlInstruction)
+            ):
+                code[idx] = instructionset.CallBuiltin(
+                    a.operands[0], b.operands[0], source=b.source
+                )
+
+    @cached_property
+    def foreign_functions(self) -> Dict[str, Callable]:
+        """The imported foreign (Python) functions, by binding name"""
+        return {
+            name: import_python_function(val.identifier, val.module)
+            for name, val in self.bindings.items()
+            if isinstance(val, TlForeignPtr)
+        }
+
+    @cached_property
+    def ip_to_name(self) -> Dict[int, str]:
+        """Map from function start IP to function name"""
+        return {ip: name for name, ip in self.locations.items()}
+
+    @cached_property
+    def _function_ips(self) -> List[int]:
+        return sorted(self.ip_to_name)
+
+    def function_at(self, ip: int) -> Tuple[str, int]:
+        """Get the name of the function containing IP, and IP's offset in it"""
+        idx = bisect_right(self._function_ips, ip) - 1
+        if idx < 0:
+            raise ValueError(f"IP {ip} is not in a function")
+        start = self._function_ips[idx]
+        return self.ip_to_name[start], ip - start
+
+    def _resolve_binding(self, instr, local_names) -> Instruction:
+        """Replace PushB with PushV if the value can be found at load time"""
+        name = str(instr.operands[0])
+        if name in local_names:
+            return instr
+        elif name in self.bindings:
+            value = self.bindings[name]
+        elif name in instructionset.BUILTINS:
+            value = TlInstruction(name)
+        else:
+            # Not defined - leave the error until runtime
+            return instr
+        return instructionset.PushV(value, source=instr.source)
+
     def listing(self) -> str:
         """Get a pretty assembly listing string"""
         print(" /")
         for i, instr in enumerate(self.code):
-            if i in self.locations.values():
-                funcname = next(
-                    k for k in self.locations.keys() if self.locations[k] == i
-                )
-                print(" | " + ui.primary(f";; {funcname}:"))
+            if i in self.ip_to_name:
+                print(" | " + ui.primary(f";; {self.ip_to_name[i]}:"))
             print(f" | {i:4} | {instr}")
         print(" \\")
 
@@ -5,8 +5,10 @@ import importlib
 import logging
 import os
 import sys
+import threading
 import traceback
 from functools import lru_cache
+from io import StringIO
 
 from ..exceptions import UserResolvableError
 
@@ -39,12 +41,70 @@ def _load_module(modname):
             ) from exc
 
 
+class _CapturingStdout:
+    """A sys.stdout replacement that captures output per-thread
+
+    While a thread is capturing, its output is buffered, and anything written by
+    other threads goes to the real standard output. This avoids swapping
+    sys.stdout for every foreign call, which isn't safe when several machines
+    run in the same process.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _target(self):
+        buf = getattr(self._local, "buf", None)
+        return sys.__stdout__ if buf is None else buf
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(sys.__stdout__, name)
+
+    def start(self):
+        buf = getattr(self._local, "spare", None)
+        if buf is None:
+            buf = StringIO()
+        else:
+            buf.seek(0)
+            buf.truncate()
+        self._local.buf = buf
+
+    def stop(self) -> str:
+        buf = self._local.buf
+        self._local.buf = None
+        self._local.spare = buf  # re-used next time
+        return buf.getvalue()
+
+
+_STDOUT = _CapturingStdout()
+
+
+def start_capture_stdout():
+    """Start capturing standard output written by this thread"""
+    if sys.stdout is not _STDOUT:
+        sys.stdout = _STDOUT
+    _STDOUT.start()
+
+
+def stop_capture_stdout() -> str:
+    """Stop capturing standard output, and get what was written"""
+    return _STDOUT.stop()
+
+
+@lru_cache
 def import_python_function(fnname, modname):
     """Load function
 
     If modname is None, fnname is taken from __builtins__ (e.g. 'print')
 
-    PYTHONPATH must be set up already.
+    PYTHONPATH must be set up already. Results are cached, so each function is
+    only imported once per process.
     """
     LOG.info(f"Starting import {modname}.{fnname}")
     m = _load_module(modname)
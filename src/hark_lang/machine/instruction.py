@@ -32,6 +32,7 @@ class Instruction:
     num_ops = None
     op_types = None
     check_op_types = True
+    opcode = None  # set in instructionset
 
     @classmethod
     def from_node(cls, ast_node, *operands):
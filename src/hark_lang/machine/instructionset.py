@@ -21,6 +21,15 @@ class JumpIf(I):
 # TODO class JumpLong ?
 
 
+class Stop(I):
+    """Halt the machine - the end of the code was reached
+
+    Never emitted by the compiler. Appended to the code as a sentinel so that
+    the machine doesn't need to bounds-check the IP on every step.
+
+    """
+
+
 class Future(I):
     """Take the top value from the stack and wrap it in a future.
 
@@ -276,3 +285,79 @@ class GetSessionId(I):
 
 class GetThreadId(I):
     """Get the current thread ID"""
+
+
+##± Super-instructions ±########################################################
+
+# Common pairs of instructions fused into one, to halve dispatch on those paths.
+# These are never emitted by the compiler - see Executable.machine_code. The
+# fused instruction replaces the first of the pair, and skips over the second.
+
+
+class BindPop(I):
+    """Bind then Pop: bind the top value on the stack to a name, and remove it"""
+
+    op_types = [mt.TlSymbol]
+
+    def __init__(self, *operands, **kwargs):
+        super().__init__(*operands, **kwargs)
+        self.symbol = str(operands[0])
+
+
+class CallBuiltin(I):
+    """PushV of a builtin function, then Call: call the builtin directly
+
+    Operands:
+      - [0] TlInstruction: The builtin function name
+      - [1] int: The number of arguments
+    """
+
+    op_types = [mt.TlInstruction, int]
+
+    def __init__(self, *operands, **kwargs):
+        super().__init__(*operands, **kwargs)
+        self.builtin = BUILTINS[operands[0]](operands[1])
+
+
+##± Opcodes ±###################################################################
+
+# Every instruction gets an integer opcode (in order of definition), which the
+# machine uses to index its table of instruction handlers
+INSTRUCTIONS = tuple(I.__subclasses__())
+
+for _opcode, _cls in enumerate(INSTRUCTIONS):
+    _cls.opcode = _opcode
+
+
+##± Builtins ±##################################################################
+
+# Functions that are implemented directly by an instruction
+BUILTINS = {
+    "future": Future,
+    "print": Print,
+    "sleep": Sleep,
+    "atomp": Atomp,
+    "nullp": Nullp,
+    "list": List,
+    "conc": Conc,
+    "append": Append,
+    "first": First,
+    "rest": Rest,
+    "length": Length,
+    "hash": Hash,
+    "get": HGet,
+    "set": HSet,
+    "nth": Nth,
+    "==": Eq,
+    "+": Plus,
+    # "-": Minus
+    "*": Multiply,
+    ">": GreaterThan,
+    "<": LessThan,
+    "&&": OpAnd,
+    "||": OpOr,
+    "parse_float": ParseFloat,
+    "signal": Signal,
+    "sid": GetSessionId,
+    "tid": GetThreadId,
+}
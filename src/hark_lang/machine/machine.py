@@ -12,8 +12,6 @@ import os
 import sys
 import time
 import traceback
-from functools import singledispatchmethod
-from io import StringIO
 from typing import Any, Dict, List
 
 from ..exceptions import HarkError, UserResolvableError, UnexpectedError
@@ -26,7 +24,7 @@ from .instructionset import *
 from .probe import Probe
 from .state import State
 from .stdout_item import StdoutItem
-from .foreign import import_python_function
+from .foreign import start_capture_stdout, stop_capture_stdout
 
 LOG = logging.getLogger(__name__)
 
@@ -49,12 +47,29 @@ class ForeignError(UserResolvableError):
 
 def traverse(o, tree_types=(list, tuple)):
     """Traverse an arbitrarily nested list"""
-    if isinstance(o, tree_types):
-        for value in o:
-            for subvalue in traverse(value, tree_types):
-                yield subvalue
-    else:
-        yield o
+    # Iterative (not recursive) to avoid creating a generator per nested list
+    stack = [o]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, tree_types):
+            stack.extend(reversed(value))
+        else:
+            yield value
+
+
+def any_future(lst) -> bool:
+    """Check whether an arbitrarily nested list contains a future"""
+    # Flat lists are the common case - only traverse nested lists if needed
+    nested = []
+    for value in lst:
+        if isinstance(value, mt.TlFuturePtr):
+            return True
+        elif isinstance(value, mt.TlList):
+            nested.append(value)
+    return any(
+        isinstance(value, mt.TlFuturePtr)
+        for value in traverse(nested, (list, mt.TlList))
+    )
 
 
 def shortstr(obj, maxl=20) -> str:
@@ -77,35 +92,7 @@ class TlMachine:
 
     """
 
-    builtins = {
-        "future": Future,
-        "print": Print,
-        "sleep": Sleep,
-        "atomp": Atomp,
-        "nullp": Nullp,
-        "list": List,
-        "conc": Conc,
-        "append": Append,
-        "first": First,
-        "rest": Rest,
-        "length": Length,
-        "hash": Hash,
-        "get": HGet,
-        "set": HSet,
-        "nth": Nth,
-        "==": Eq,
-        "+": Plus,
-        # "-": Minus
-        "*": Multiply,
-        ">": GreaterThan,
-        "<": LessThan,
-        "&&": OpAnd,
-        "||": OpOr,
-        "parse_float": ParseFloat,
-        "signal": Signal,
-        "sid": GetSessionId,
-        "tid": GetThreadId,
-    }
+    builtins = BUILTINS
 
     def __init__(self, vmid, invoker):
         self._steps = 0
@@ -113,15 +100,62 @@ class TlMachine:
         self.invoker = invoker
         self.dc = invoker.data_controller
         self.state = self.dc.get_state(self.vmid)
-        self.probe = Probe(self.vmid)
+        # The data stack is used directly (not via State.ds_push etc) to avoid
+        # a method call (and type check) on every stack operation. Values are
+        # always TlTypes, because instruction operands are checked when the
+        # code is created.
+        self._ds = self.state._ds
+        self.probe = Probe(self.vmid, trace_steps=bool(os.getenv("HARK_TRACE_STEPS")))
         self.exe = self.dc.executable
         if not self.exe:
             raise UnexpectedError("No executable, can't start thread.")
-        self._foreign = {
-            name: import_python_function(val.identifier, val.module)
-            for name, val in self.exe.bindings.items()
-            if isinstance(val, mt.TlForeignPtr)
+        self._foreign = self.exe.foreign_functions
+        handlers = {
+            Bind: self._do_bind,
+            PushB: self._do_pushb,
+            PushV: self._do_pushv,
+            Pop: self._do_pop,
+            Jump: self._do_jump,
+            JumpIf: self._do_jumpif,
+            Stop: self._do_stop,
+            Return: self._do_return,
+            Call: self._do_call,
+            ACall: self._do_acall,
+            Wait: self._do_wait,
+            Future: self._do_future,
+            Atomp: self._do_atomp,
+            Nullp: self._do_nullp,
+            List: self._do_list,
+            Conc: self._do_conc,
+            Append: self._do_append,
+            First: self._do_first,
+            Rest: self._do_rest,
+            Nth: self._do_nth,
+            Length: self._do_length,
+            Hash: self._do_hash,
+            HGet: self._do_hget,
+            HSet: self._do_hset,
+            Plus: self._do_plus,
+            Multiply: self._do_multiply,
+            Eq: self._do_eq,
+            GreaterThan: self._do_greaterthan,
+            LessThan: self._do_lessthan,
+            OpAnd: self._do_opand,
+            OpOr: self._do_opor,
+            ParseFloat: self._do_parsefloat,
+            Sleep: self._do_sleep,
+            Print: self._do_print,
+            Signal: self._do_signal,
+            GetSessionId: self._do_getsessionid,
+            GetThreadId: self._do_getthreadid,
+            BindPop: self._do_bindpop,
+            CallBuiltin: self._do_callbuiltin,
         }
+        # Instruction dispatch table, indexed by opcode. Indexing a tuple is
+        # about the cheapest dispatch available (no hashing or MRO walk).
+        self._handlers = tuple(
+            handlers.get(cls, self._not_implemented) for cls in INSTRUCTIONS
+        )
         LOG.debug("locations %s", self.exe.locations.keys())
         LOG.debug("foreign %s", self._foreign.keys())
         # No entrypoint argument - just set the IP in the state
@@ -135,21 +169,30 @@ class TlMachine:
         return self.exe.code[self.state.ip]
 
     def step(self):
-        """Execute the current instruction and increment the IP"""
-        if self.state.ip >= len(self.exe.code):
-            raise UnexpectedError("Instruction Pointer out of bounds")
-        instr = self.exe.code[self.state.ip]
-        self.probe.event(
-            "step",
-            ip=self.state.ip,
-            instr=str(instr),
-            ops=str(instr.operands),
-            top_of_stack=shortstr(self.state._ds[-3:]),
-        )
+        """Execute the current instruction and increment the IP
+
+        NOTE: run() doesn't use this - it inlines the same logic for speed.
+        """
+        if self.probe.trace_steps:
+            instr = self.exe.traced_code[self.state.ip]
+            self._trace_step(instr)
+        else:
+            instr = self.exe.machine_code[self.state.ip]
         self.state.ip += 1  # NOTE - IP incremented before evaluation
-        self.evali(instr)
+        self._handlers[instr.opcode](instr)
         self._steps += 1  # Counts successfully completed steps
 
+    def _trace_step(self, instr):
+        """Record the step that's about to be taken"""
+        ip = self.state.ip
+        name, offset = self.exe.function_at(ip)
+        # Record the instruction as compiled (as in the listing), rather than
+        # the optimised one that's actually run
+        code = self.exe.code
+        if ip < len(code):
+            instr = code[ip]
+        self.probe.on_step(ip, f"{name}+{offset}", instr, shortstr(self._ds[-3:]))
+
     def run(self):
         """Step through instructions until stopped, or an error occurs
 
@@ -164,27 +207,78 @@ class TlMachine:
         self.probe.event("run")
         broken = False
 
-        self.state.stopped = False
-        while not self.state.stopped:
-            try:
-                self.step()
-            except HarkError as exc:
-                broken = True
-                self.state.stopped = True
-                self.state.error_msg = str(exc)
-                # TODO maybe dump the "core"
-                break
-            except Exception as exc:
-                # It's important to catch *all* errors so that other threads
-                # don't continue waiting for this to return.
-                broken = True
-                self.state.stopped = True
-                msg = f"Unexpected Exception:\n\n" + "".join(
-                    traceback.format_exception(*sys.exc_info())
-                )
-                self.state.error_msg = msg
-                break
+        # This is the machine's inner loop - the body of step() is inlined,
+        # and everything it touches is hoisted into locals. There's no IP
+        # bounds check: the code ends with a Stop sentinel instead.
+        state = self.state
+        ds = self._ds
+        trace_steps = self.probe.trace_steps
+        # Super-instructions are only used when not tracing, so that every
+        # step is recorded
+        code = self.exe.traced_code if trace_steps else self.exe.machine_code
+        exe_bindings = self.exe.bindings
+        push = ds.append
+        pop = ds.pop
+        handlers = self._handlers
+        falsy = (mt.TlNull, mt.TlFalse)
+        steps = 0
+
+        state.stopped = False
+        try:
+            while not state.stopped:
+                instr = code[state.ip]
+                if trace_steps:
+                    self._trace_step(instr)
+                state.ip += 1  # NOTE - IP incremented before evaluation
+
+                # The most common instructions are handled inline, without a
+                # method call. Their handlers deal with the uncommon cases
+                # (e.g. errors). Everything else goes through the table.
+                cls = instr.__class__
+                if cls is PushB:
+                    sym = instr.operands[0]
+                    if sym in state.bindings:
+                        push(state.bindings[sym])
+                    elif sym in exe_bindings:
+                        push(exe_bindings[sym])
+                    else:
+                        handlers[instr.opcode](instr)
+                elif cls is PushV:
+                    push(instr.operands[0])
+                elif cls is Pop:
+                    pop()
+                elif cls is BindPop and ds:
+                    state.bindings[instr.symbol] = pop()
+                    state.ip += 1
+                    steps += 1  # for the skipped Pop
+                elif cls is Bind and ds:
+                    state.bindings[str(instr.operands[0])] = ds[-1]
+                elif cls is Jump:
+                    state.ip += instr.operands[0]
+                elif cls is JumpIf:
+                    # "true" means anything that's not False or Null
+                    if pop().__class__ not in falsy:
+                        state.ip += instr.operands[0]
+                else:
+                    handlers[instr.opcode](instr)
+
+                steps += 1  # Counts successfully completed steps
+        except HarkError as exc:
+            broken = True
+            state.stopped = True
+            state.error_msg = str(exc)
+            # TODO maybe dump the "core"
+        except Exception as exc:
+            # It's important to catch *all* errors so that other threads
+            # don't continue waiting for this to return.
+            broken = True
+            state.stopped = True
+            msg = f"Unexpected Exception:\n\n" + "".join(
+                traceback.format_exception(*sys.exc_info())
+            )
+            state.error_msg = msg
 
+        self._steps += steps
         self.probe.event("stop", steps=self._steps)
         self.dc.set_state(self.vmid, self.state)
         self.dc.set_probe_data(self.vmid, self.probe)
@@ -192,17 +286,28 @@ class TlMachine:
         # conditions in us setting/the user reading the state and probe data
         self.dc.stop(self.vmid, finished_ok=not broken)
 
-    @singledispatchmethod
+    def _pop_args(self, num: int) -> list:
+        """Remove the top NUM values from the data stack, in the order pushed"""
+        if num > len(self._ds):
+            raise UnexpectedError(f"Not enough values on the stack (need {num})")
+        if not num:
+            return []
+        args = self._ds[-num:]
+        del self._ds[-num:]
+        return args
+
     def evali(self, i: Instruction):
         """Evaluate instruction"""
+        self._handlers[i.opcode](i)
+
+    def _not_implemented(self, i: Instruction):
         raise NotImplementedError(i)
 
-    @evali.register
-    def _(self, i: Bind):
+    def _do_bind(self, i: Bind):
         """Bind the top value on the data stack to a name"""
         ptr = str(i.operands[0])
         try:
-            val = self.state.ds_peek(0)
+            val = self._ds[-1]
         except IndexError as exc:
             # FIXME this should be a compile time check
             raise UserResolvableError(
@@ -214,8 +319,14 @@ class TlMachine:
             raise UnexpectedError(f"Bad value to Bind: {val} ({type(val)})")
         self.state.bindings[ptr] = val
 
-    @evali.register
-    def _(self, i: PushB):
+    def _do_bindpop(self, i: BindPop):
+        """Bind the value on the top of the stack to a name, and pop it"""
+        self._do_bind(i)
+        self._ds.pop()
+        self.state.ip += 1  # skip the Pop
+        self._steps += 1
+
+    def _do_pushb(self, i: PushB):
         """Push the value bound to a name onto the data stack"""
         # The value on the stack must be a Symbol, which is used to find a
         # function to call. Binding precedence:
@@ -236,32 +347,30 @@ class TlMachine:
             # FIXME should be a compile time check
             raise UserResolvableError(f"'{ptr}' is not defined", "")
 
-        self.state.ds_push(val)
+        self._ds.append(val)
 
-    @evali.register
-    def _(self, i: PushV):
+    def _do_pushv(self, i: PushV):
         val = i.operands[0]
-        self.state.ds_push(val)
+        self._ds.append(val)
 
-    @evali.register
-    def _(self, i: Pop):
-        self.state.ds_pop()
+    def _do_pop(self, i: Pop):
+        self._ds.pop()
 
-    @evali.register
-    def _(self, i: Jump):
+    def _do_jump(self, i: Jump):
         distance = i.operands[0]
         self.state.ip += distance
 
-    @evali.register
-    def _(self, i: JumpIf):
+    def _do_jumpif(self, i: JumpIf):
         distance = i.operands[0]
-        a = self.state.ds_pop()
+        a = self._ds.pop()
         # "true" means anything that's not False or Null
-        if not isinstance(a, (mt.TlNull, mt.TlFalse)):
+        if a.__class__ is not mt.TlNull and a.__class__ is not mt.TlFalse:
             self.state.ip += distance
 
-    @evali.register
-    def _(self, i: Return):
+    def _do_stop(self, i: Stop):
+        raise UnexpectedError("Instruction Pointer out of bounds")
+
+    def _do_return(self, i: Return):
         # Only return if there's somewhere to go to, and it's in the same thread
         current_arec = self.dc.pop_arec(self.state.current_arec_ptr)
         if current_arec.dynamic_chain is not None:
@@ -275,7 +384,7 @@ class TlMachine:
 
         # Otherwise, this thread has finished!
         self.state.stopped = True
-        value = self.state.ds_peek(0)
+        value = self._ds[-1]
         self.probe.log(f"Returning value: {shortstr(value)}")
         value, continuations = self.dc.finish(self.vmid, value)
         for machine in continuations:
@@ -285,12 +394,11 @@ class TlMachine:
             # tricky with Lambda timeouts.
             self.invoker.invoke(machine)
 
-    @evali.register
-    def _(self, i: Call):
+    def _do_call(self, i: Call):
         # Arguments for the function must already be on the stack
         num_args = i.operands[0]
         # The value to call will have been retrieved earlier by PushB.
-        fn = self.state.ds_pop()
+        fn = self._ds.pop()
 
         if isinstance(fn, mt.TlFunctionPtr):
             self.probe.event("call", function=str(fn))
@@ -309,33 +417,30 @@ class TlMachine:
         elif isinstance(fn, mt.TlForeignPtr):
             self.probe.event("call_foreign", function=str(fn))
             foreign_f = self._foreign[fn.identifier]
-            args = tuple(reversed([self.state.ds_pop() for _ in range(num_args)]))
+            args = self._pop_args(num_args)
             # TODO automatically wait for the args? Somehow mark which one we're
             # waiting for in the continuation
 
-            py_args = list(map(mt.to_py_type, args))
+            py_args = [mt.to_py_type(a) for a in args]
 
             # capture Python's standard output
-            sys.stdout = capstdout = StringIO()
+            start_capture_stdout()
             try:
                 py_result = foreign_f(*py_args)
             except Exception as e:
-                out = capstdout.getvalue()
-                self.dc.write_stdout(StdoutItem(self.vmid, out))
                 raise ForeignError(e) from e
             finally:
-                sys.stdout = sys.__stdout__
-
-            # These aren't included in the finally clause because that really
-            # slows down the cleanup
-            out = capstdout.getvalue()
-            self.dc.write_stdout(StdoutItem(self.vmid, out))
+                # Always stop capturing (even on e.g. SystemExit)
+                self._write_foreign_stdout(stop_capture_stdout())
 
             result = mt.to_hark_type(py_result)
-            self.state.ds_push(result)
+            self._ds.append(result)
 
         elif isinstance(fn, mt.TlInstruction):
-            self.probe.event("call_builtin", function=str(fn))
+            # Builtins are called as often as instructions, so only record
+            # these if steps are being traced too
+            if self.probe.trace_steps:
+                self.probe.event("call_builtin", function=str(fn))
             instr = TlMachine.builtins[fn](num_args)
             self.evali(instr)
 
@@ -343,12 +448,24 @@ class TlMachine:
             # FIXME this should be a compile time check
             raise UnexpectedError(f"Don't know how to call `{fn}' of type {type(fn)}.")
 
-    @evali.register
-    def _(self, i: ACall):
+    def _write_foreign_stdout(self, out: str):
+        # Most foreign functions don't print anything - skip the (possibly
+        # remote) controller write if so
+        if out:
+            self.dc.write_stdout(StdoutItem(self.vmid, out))
+
+    def _do_callbuiltin(self, i: CallBuiltin):
+        """Call a builtin directly, skipping the following Call"""
+        # NOTE: Not used when tracing steps, so there's no call_builtin event
+        self.state.ip += 1  # skip the Call (and behave as if it's executing)
+        self._handlers[i.builtin.opcode](i.builtin)
+        self._steps += 1
+
+    def _do_acall(self, i: ACall):
         # Arguments for the function must already be on the stack
         # ACall can *only* call functions in self.locations (unlike Call)
         num_args = i.operands[0]
-        fn_ptr = self.state.ds_pop()
+        fn_ptr = self._ds.pop()
 
         # FIXME ugh.
         if isinstance(fn_ptr, mt.TlForeignPtr):
@@ -362,7 +479,7 @@ class TlMachine:
                 f"Can't find function `{fn_ptr}'.", "Does it really exist?"
             )
 
-        args = reversed([self.state.ds_pop() for _ in range(num_args)])
+        args = self._pop_args(num_args)
         machine = self.dc.thread_machine(
             self.state.current_arec_ptr, self.state.ip, fn_ptr, args
         )
@@ -370,17 +487,19 @@ class TlMachine:
         future = mt.TlFuturePtr(machine)
 
         self.probe.event("fork", to_function=fn_ptr.identifier, to_thread=machine)
-        self.state.ds_push(future)
+        self._ds.append(future)
 
-    @evali.register
-    def _(self, i: Wait):
-        val = self.state.ds_peek(0)
+    def _do_wait(self, i: Wait):
+        val = self._ds[-1]
+        # Most values waited on are not futures (or lists), so this exits after
+        # a couple of class identity checks in the common case.
+        cls = val.__class__
 
-        if isinstance(val, mt.TlFuturePtr):
+        if cls is mt.TlFuturePtr:
             resolved, result = self.dc.get_or_wait(self.vmid, val)
             if resolved:
                 self.probe.log(f"{val} resolved, got {shortstr(result)}")
-                self.state.ds_set(0, result)
+                self._ds[-1] = result
             else:
                 self.probe.log(f"Waiting for {val}")
                 # repeat the Wait instruction again:
@@ -390,9 +509,7 @@ class TlMachine:
                 self.state.ip -= 1
                 self.state.stopped = True
 
-        elif isinstance(val, list) and any(
-            isinstance(elt, mt.TlFuturePtr) for elt in traverse(val)
-        ):
+        elif cls is mt.TlList and any_future(val):
             # The programmer is responsible for waiting on all elements
             # of lists.
             # NOTE - we don't try to detect futures hidden in other
@@ -410,159 +527,146 @@ class TlMachine:
 
     ## "builtins":
 
-    @evali.register
-    def _(self, i: Future):
-        wrapped = str(self.state.ds_pop())
-        plugin_name = str(self.state.ds_pop())
+    def _do_future(self, i: Future):
+        wrapped = str(self._ds.pop())
+        plugin_name = str(self._ds.pop())
 
         if self.dc.supports_plugin(plugin_name):
             # Return a Future which can be waited on
             self.probe.event("fork_plugin", plugin=plugin_name, wrapped=wrapped)
             future_id = self.dc.add_plugin_future(plugin_name, wrapped)
-            self.state.ds_push(mt.TlFuturePtr(future_id))
+            self._ds.append(mt.TlFuturePtr(future_id))
 
         else:
             # Just return the wrapped immediately
             self.probe.log("Skipping call to plugin - controller doesn't support it")
-            self.state.ds_push(wrapped)
+            self._ds.append(mt.TlString(wrapped))
 
-    @evali.register
-    def _(self, i: Atomp):
-        val = self.state.ds_pop()
-        self.state.ds_push(tl_bool(not isinstance(val, list)))
+    def _do_atomp(self, i: Atomp):
+        val = self._ds.pop()
+        self._ds.append(tl_bool(not isinstance(val, list)))
 
-    @evali.register
-    def _(self, i: Nullp):
-        val = self.state.ds_pop()
-        isnull = isinstance(val, mt.TlNull) or len(val) == 0
-        self.state.ds_push(tl_bool(isnull))
+    def _do_nullp(self, i: Nullp):
+        val = self._ds.pop()
+        isnull = val.__class__ is mt.TlNull or len(val) == 0
+        self._ds.append(tl_bool(isnull))
 
-    @evali.register
-    def _(self, i: List):
+    def _do_list(self, i: List):
         num_args = i.operands[0]
-        elts = [self.state.ds_pop() for _ in range(num_args)]
-        self.state.ds_push(mt.TlList(reversed(elts)))
+        self._ds.append(mt.TlList.wrap(self._pop_args(num_args)))
 
-    @evali.register
-    def _(self, i: Conc):
-        b = self.state.ds_pop()
-        a = self.state.ds_pop()
+    def _do_conc(self, i: Conc):
+        b = self._ds.pop()
+        a = self._ds.pop()
 
         # Null is interpreted as the empty list for b
-        b = mt.TlList([]) if isinstance(b, mt.TlNull) else b
+        b = mt.TlList([]) if b.__class__ is mt.TlNull else b
 
-        if not isinstance(b, mt.TlList):
+        if b.__class__ is not mt.TlList:
             # TODO compile time checks...
             raise UserResolvableError(f"b ({b}, {type(b)}) is not a list", "")
 
-        if isinstance(a, mt.TlList):
-            self.state.ds_push(mt.TlList(a + b))
+        if a.__class__ is mt.TlList:
+            self._ds.append(mt.TlList.wrap(a.data + b.data))
         else:
-            self.state.ds_push(mt.TlList([a] + b))
+            self._ds.append(mt.TlList.wrap([a] + b.data))
 
-    @evali.register
-    def _(self, i: Append):
-        b = self.state.ds_pop()
-        a = self.state.ds_pop()
+    def _do_append(self, i: Append):
+        b = self._ds.pop()
+        a = self._ds.pop()
 
-        a = mt.TlList([]) if isinstance(a, mt.TlNull) else a
+        a = mt.TlList([]) if a.__class__ is mt.TlNull else a
 
-        if not isinstance(a, mt.TlList):
+        if a.__class__ is not mt.TlList:
             # TODO compile time checks...
             raise UserResolvableError(f"{a} ({type(a)}) is not a list", "")
 
-        self.state.ds_push(mt.TlList(a + [b]))
+        self._ds.append(mt.TlList.wrap(a.data + [b]))
 
-    @evali.register
-    def _(self, i: First):
-        lst = self.state.ds_pop()
-        if not isinstance(lst, mt.TlList):
+    def _do_first(self, i: First):
+        lst = self._ds.pop()
+        if lst.__class__ is not mt.TlList:
             raise UserResolvableError(f"{lst} ({type(lst)}) is not a list", "")
-        self.state.ds_push(lst[0])
+        self._ds.append(lst[0])
 
-    @evali.register
-    def _(self, i: Rest):
-        lst = self.state.ds_pop()
-        if not isinstance(lst, mt.TlList):
+    def _do_rest(self, i: Rest):
+        lst = self._ds.pop()
+        if lst.__class__ is not mt.TlList:
             raise UserResolvableError(f"{lst} ({type(lst)}) is not a list", "")
-        self.state.ds_push(lst[1:])
+        self._ds.append(mt.TlList.wrap(lst.data[1:]))
 
-    @evali.register
-    def _(self, i: Nth):
-        n = self.state.ds_pop()
-        lst = self.state.ds_pop()
-        if not isinstance(lst, mt.TlList):
+    def _do_nth(self, i: Nth):
+        n = self._ds.pop()
+        lst = self._ds.pop()
+        if lst.__class__ is not mt.TlList:
             raise UserResolvableError(f"{lst} ({type(lst)}) is not a list", "")
-        self.state.ds_push(lst[n])
+        self._ds.append(lst[n])
 
-    @evali.register
-    def _(self, i: Length):
-        lst = self.state.ds_pop()
-        if not isinstance(lst, mt.TlList):
+    def _do_length(self, i: Length):
+        lst = self._ds.pop()
+        if lst.__class__ is not mt.TlList:
             raise UserResolvableError(f"{lst} ({type(lst)}) is not a list", "")
-        self.state.ds_push(mt.TlInt(len(lst)))
+        self._ds.append(mt.TlInt(len(lst)))
 
-    @evali.register
-    def _(self, i: Hash):
+    def _do_hash(self, i: Hash):
         num_args = i.operands[0]
-        # convert list [a, b, c, d] (reversed) -> dict {a: b, c: d}
-        elts = [self.state.ds_pop() for _ in range(num_args)][::-1]
+        # convert list [a, b, c, d] -> dict {a: b, c: d}
+        elts = self._pop_args(num_args)
         pairs = zip(elts[::2], elts[1::2])
-        self.state.ds_push(mt.TlHash(pairs))
+        self._ds.append(mt.TlHash(pairs))
 
-    @evali.register
-    def _(self, i: HGet):
-        key = self.state.ds_pop()
-        obj = self.state.ds_pop()
+    def _do_hget(self, i: HGet):
+        key = self._ds.pop()
+        obj = self._ds.pop()
         if not isinstance(obj, mt.TlHash):
             raise UserResolvableError(f"{obj} ({type(obj)}) is not a hash", "")
         try:
             res = obj[key]
         except KeyError:
             res = mt.TlNull()
-        self.state.ds_push(res)
+        self._ds.append(res)
 
-    @evali.register
-    def _(self, i: HSet):
-        value = self.state.ds_pop()
-        key = self.state.ds_pop()
-        obj = self.state.ds_pop()
+    def _do_hset(self, i: HSet):
+        value = self._ds.pop()
+        key = self._ds.pop()
+        obj = self._ds.pop()
         if not isinstance(obj, mt.TlHash):
             raise UserResolvableError(f"{obj} ({type(obj)}) is not a hash", "")
         # Create a new object, overwriting the old key
-        self.state.ds_push(mt.TlHash({**obj, key: value}))
-
-    @evali.register
-    def _(self, i: Plus):
-        a = self.state.ds_pop()
-        b = self.state.ds_pop()
-        cls = new_number_type(a, b)
-        self.state.ds_push(cls(a + b))
-
-    @evali.register
-    def _(self, i: Multiply):
-        a = self.state.ds_pop()
-        b = self.state.ds_pop()
-        cls = new_number_type(a, b)
-        self.state.ds_push(cls(a * b))
-
-    @evali.register
-    def _(self, i: Eq):
-        a = self.state.ds_pop()
-        b = self.state.ds_pop()
-        self.state.ds_push(tl_bool(a == b))
-
-    @evali.register
-    def _(self, i: GreaterThan):
-        a = self.state.ds_pop()
-        b = self.state.ds_pop()
-        self.state.ds_push(tl_bool(a > b))
-
-    @evali.register
-    def _(self, i: LessThan):
-        a = self.state.ds_pop()
-        b = self.state.ds_pop()
-        self.state.ds_push(tl_bool(a < b))
+        self._ds.append(mt.TlHash({**obj, key: value}))
+
+    def _do_plus(self, i: Plus):
+        a = self._ds.pop()
+        b = self._ds.pop()
+        cls = a.__class__
+        # Fast path for two numbers of the same type (usually TlInt)
+        if cls is not b.__class__ or (cls is not mt.TlInt and cls is not mt.TlFloat):
+            cls = new_number_type(a, b)
+        self._ds.append(cls(a + b))
+
+    def _do_multiply(self, i: Multiply):
+        a = self._ds.pop()
+        b = self._ds.pop()
+        cls = a.__class__
+        # Fast path for two numbers of the same type (usually TlInt)
+        if cls is not b.__class__ or (cls is not mt.TlInt and cls is not mt.TlFloat):
+            cls = new_number_type(a, b)
+        self._ds.append(cls(a * b))
+
+    def _do_eq(self, i: Eq):
+        a = self._ds.pop()
+        b = self._ds.pop()
+        self._ds.append(tl_bool(a == b))
+
+    def _do_greaterthan(self, i: GreaterThan):
+        a = self._ds.pop()
+        b = self._ds.pop()
+        self._ds.append(tl_bool(a > b))
+
+    def _do_lessthan(self, i: LessThan):
+        a = self._ds.pop()
+        b = self._ds.pop()
+        self._ds.append(tl_bool(a < b))
 
     def _check_bools(self, op, a, b):
         if not isinstance(a, mt.BOOLEANS) or not isinstance(b, mt.BOOLEANS):
@@ -571,60 +675,48 @@ class TlMachine:
                 f"Got {a.__tlname__} and {b.__tlname__}",
             )
 
-    @evali.register
-    def _(self, i: OpAnd):
+    def _do_opand(self, i: OpAnd):
         # FIXME no short-circuit behaviour
-        a = self.state.ds_pop()
-        b = self.state.ds_pop()
+        a = self._ds.pop()
+        b = self._ds.pop()
         self._check_bools("&&", a, b)
-        self.state.ds_push(
-            tl_bool(isinstance(a, mt.TlTrue) and isinstance(b, mt.TlTrue))
-        )
+        self._ds.append(tl_bool(isinstance(a, mt.TlTrue) and isinstance(b, mt.TlTrue)))
 
-    @evali.register
-    def _(self, i: OpOr):
+    def _do_opor(self, i: OpOr):
         # FIXME no short-circuit behaviour
-        a = self.state.ds_pop()
-        b = self.state.ds_pop()
+        a = self._ds.pop()
+        b = self._ds.pop()
         self._check_bools("||", a, b)
-        self.state.ds_push(
-            tl_bool(isinstance(a, mt.TlTrue) or isinstance(b, mt.TlTrue))
-        )
+        self._ds.append(tl_bool(isinstance(a, mt.TlTrue) or isinstance(b, mt.TlTrue)))
 
-    @evali.register
-    def _(self, i: ParseFloat):
-        x = self.state.ds_pop()
-        self.state.ds_push(mt.TlFloat(float(x)))
+    def _do_parsefloat(self, i: ParseFloat):
+        x = self._ds.pop()
+        self._ds.append(mt.TlFloat(float(x)))
 
-    @evali.register
-    def _(self, i: Sleep):
-        t = self.state.ds_peek(0)
+    def _do_sleep(self, i: Sleep):
+        t = self._ds[-1]
         time.sleep(t)
 
-    @evali.register
-    def _(self, i: Print):
+    def _do_print(self, i: Print):
         # Leave the value in the stack - print() 'returns' the value printed
-        val = self.state.ds_peek(0)
+        val = self._ds[-1]
         # This should take a vmid - data stored is a tuple (vmid, str)
         # Could also store a timestamp...
         self.dc.write_stdout(StdoutItem(self.vmid, str(val) + "\n"))
 
-    @evali.register
-    def _(self, i: Signal):
-        msg = self.state.ds_peek(0)
-        val = self.state.ds_peek(1)
+    def _do_signal(self, i: Signal):
+        msg = self._ds[-1]
+        val = self._ds[-2]
         self.dc.write_stdout(StdoutItem(self.vmid, f"\n[signal {val}]: {msg}\n"))
         if str(val) == "error":
             raise UnhandledError(msg)
         # other kinds of signals don't need special handling
 
-    @evali.register
-    def _(self, i: GetSessionId):
-        self.state.ds_push(mt.TlString(self.dc.session_id))
+    def _do_getsessionid(self, i: GetSessionId):
+        self._ds.append(mt.TlString(self.dc.session_id))
 
-    @evali.register
-    def _(self, i: GetThreadId):
-        self.state.ds_push(mt.TlInt(self.vmid))
+    def _do_getthreadid(self, i: GetThreadId):
+        self._ds.append(mt.TlInt(self.vmid))
 
     def __repr__(self):
         return f"<Machine {id(self)}>"
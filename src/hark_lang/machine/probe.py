@@ -26,10 +26,26 @@ class ProbeEvent(HarkSerialisable):
 class Probe:
     """A small interface for storing machine logs and events"""
 
-    def __init__(self, vmid):
+    __slots__ = ("vmid", "logs", "events", "trace_steps")
+
+    def __init__(self, vmid, trace_steps=False):
         self.vmid = vmid
         self.logs = []
         self.events = []
+        # Recording every step (and builtin call) is expensive, so it's opt-in.
+        # The machine checks this flag rather than calling on_step every time.
+        self.trace_steps = trace_steps
+
+    def on_step(self, ip: int, location: str, instr, top_of_stack: str):
+        """Record a machine step (only called if trace_steps is set)"""
+        self.event(
+            "step",
+            ip=ip,
+            location=location,
+            instr=str(instr),
+            ops=str(instr.operands),
+            top_of_stack=top_of_stack,
+        )
 
     def event(self, etype: str, **data):
         e = ProbeEvent(thread=self.vmid, time=now_str(), event=etype, data=data)
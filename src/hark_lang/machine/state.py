@@ -9,6 +9,18 @@ from .types import TlType
 class State:
     """Data local/specific to a particular thread"""
 
+    # The machine accesses these on (almost) every step
+    __slots__ = (
+        "ip",
+        "_ds",
+        "stopped",
+        "bindings",
+        "error_msg",
+        "current_arec_ptr",
+        "_serialised_ds",
+        "_serialised_bindings",
+    )
+
     def __init__(self, data):
         self.ip = 0
         self._ds = list(data)
@@ -16,6 +28,9 @@ class State:
         self.bindings = {}
         self.error_msg = None
         self.current_arec_ptr = None
+        # Values serialised last time, and the results (see serialise)
+        self._serialised_ds = ([], [])
+        self._serialised_bindings = {}
 
     def ds_push(self, val):
         if not isinstance(val, TlType):
@@ -52,11 +67,38 @@ class State:
         return f"<State {id(self)} ip={self.ip}>"
 
     def serialise(self):
+        """Serialise to a JSON-compatible dict
+
+        NOTE: The serialised values are re-used by later calls, so they must not
+        be modified.
+        """
+        # Values are never modified in place, so anything that's unchanged (the
+        # same object) since the last serialise can re-use the previous result.
+        # The data stack is mostly pushed and popped at the top, so only the
+        # values above the unchanged prefix are serialised.
+        prev_values, prev_ds = self._serialised_ds
+        limit = min(len(prev_values), len(self._ds))
+        n = 0
+        while n < limit and prev_values[n] is self._ds[n]:
+            n += 1
+        ds = prev_ds[:n] + [value.serialise() for value in self._ds[n:]]
+        self._serialised_ds = (list(self._ds), ds)
+
+        prev_bindings = self._serialised_bindings
+        serialised_bindings = {}
+        for name, value in self.bindings.items():
+            prev = prev_bindings.get(name)
+            if prev is not None and prev[0] is value:
+                serialised_bindings[name] = prev
+            else:
+                serialised_bindings[name] = (value, value.serialise())
+        self._serialised_bindings = serialised_bindings
+
         return dict(
             ip=self.ip,
             stopped=self.stopped,
-            ds=[value.serialise() for value in self._ds],
-            bindings={name: value.serialise() for name, value in self.bindings.items()},
+            ds=list(ds),
+            bindings={name: ser for name, (_, ser) in serialised_bindings.items()},
             error_msg=self.error_msg,
             current_arec_ptr=self.current_arec_ptr,
         )
@@ -70,6 +112,12 @@ class State:
         s.bindings = {
             name: TlType.deserialise(val) for name, val in data["bindings"].items()
         }
+        # Seed the serialise cache, so a resumed state that is saved again
+        # doesn't re-serialise everything it was loaded with.
+        s._serialised_ds = (list(s._ds), list(data["ds"]))
+        s._serialised_bindings = {
+            name: (s.bindings[name], val) for name, val in data["bindings"].items()
+        }
         s.error_msg = data["error_msg"]
         s.current_arec_ptr = data["current_arec_ptr"]
         return s
@@ -10,10 +10,20 @@ from collections import UserList, UserDict
 
 # TODO Convert these to dataclasses
 
+# NOTE: The machine checks some types by identity, not isinstance (e.g.
+# `x.__class__ is TlList`), so don't subclass the concrete types.
+
 
 class TlType:
     """Base class"""
 
+    # All the concrete types, by name (see deserialise)
+    _types = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        TlType._types[cls.__name__] = cls
+
     @property
     def __tlname__(self):
         return type(self).__name__
@@ -29,9 +39,7 @@ class TlType:
 
     @classmethod
     def deserialise(cls, obj: list):
-        name = obj[0]
-        new_cls = globals()[name]
-        return new_cls.from_data(obj[1])
+        return TlType._types[obj[0]].from_data(obj[1])
 
 
 ### Atomics
@@ -136,6 +144,13 @@ class TlQuote(TlType):
 
 
 class TlList(UserList, TlType):
+    @classmethod
+    def wrap(cls, data: list) -> "TlList":
+        """Make a TlList which takes ownership of DATA, without copying it"""
+        lst = cls()
+        lst.data = data
+        return lst
+
     def serialise_data(self):
         return [a.serialise() for a in self.data]
 
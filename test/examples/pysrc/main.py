@@ -1,5 +1,6 @@
-import time
 import random
+import sys
+import time
 
 
 def hi():
@@ -26,3 +27,8 @@ def coin():
 
 def bad_fn():
     raise Exception("Something broke!")
+
+
+def exit_fn():
+    print("exiting")
+    sys.exit(1)
@@ -0,0 +1,138 @@
+import pytest
+
+from hark_lang.load import compile_text
+from hark_lang.machine.executable import Executable
+from hark_lang.machine.instruction import Instruction
+from hark_lang.machine import instructionset
+from hark_lang.machine.instructionset import *
+from hark_lang.machine.types import *
+
+from .test_machine import run_exe
+
+
+def make_exe(functions) -> Executable:
+    """Make an executable from a dict of function name -> code"""
+    bindings, locations, code = {}, {}, []
+    for idx, (name, fn_code) in enumerate(functions.items()):
+        identifier = f"#{idx}:{name}"
+        bindings[name] = TlFunctionPtr(identifier)
+        locations[identifier] = len(code)
+        code += fn_code
+    return Executable(bindings, locations, code, {})
+
+
+def run_main(exe):
+    controller = run_exe(exe)
+    assert not controller.broken
+    return controller.result
+
+
+def test_fused_instructions():
+    exe = compile_text("fn main(x) { y = x; print(y) }")
+    assert [type(i) for i in exe.code] == [
+        Bind,
+        Pop,
+        PushB,
+        Bind,
+        Pop,
+        PushB,
+        PushB,
+        Call,
+        Return,
+    ]
+    # Positions are unchanged, and the partners are left in place
+    assert [type(i) for i in exe.machine_code] == [
+        BindPop,
+        Pop,
+        PushB,
+        BindPop,
+        Pop,
+        PushB,
+        CallBuiltin,
+        Call,
+        Return,
+        Stop,
+    ]
+
+
+def test_fused_instructions_serialise():
+    exe = compile_text("fn main(x) { y = x; print(y) }")
+    for instr in exe.machine_code:
+        ser = instr.serialise()
+        assert ser[0] == type(instr).__name__
+        assert Instruction.deserialise(ser, instructionset) == instr
+
+
+def test_no_fusion_across_functions():
+    exe = make_exe(
+        {
+            "main": [PushV(TlInt(1)), Bind(TlSymbol("x"))],
+            "other": [Pop(), PushV(TlInstruction("print"))],
+            "another": [Call(TlInt(1)), Return()],
+        }
+    )
+    assert [type(i) for i in exe.machine_code] == [
+        PushV,
+        Bind,
+        Pop,
+        PushV,
+        Call,
+        Return,
+        Stop,
+    ]
+
+
+def test_jump_to_fused_pop():
+    exe = make_exe(
+        {
+            "main": [
+                PushV(TlInt(2)),
+                PushV(TlInt(1)),
+                Jump(TlInt(1)),
+                Bind(TlSymbol("x")),
+                Pop(),  # <- jump here
+                Return(),
+            ]
+        }
+    )
+    assert isinstance(exe.machine_code[3], BindPop)
+    assert run_main(exe) == 2
+
+
+def test_jump_to_fused_call():
+    exe = make_exe(
+        {
+            "main": [
+                PushV(TlInt(3)),
+                PushV(TlInt(4)),
+                PushV(TlInstruction("+")),
+                Jump(TlInt(1)),
+                PushV(TlInstruction("+")),
+                Call(TlInt(2)),  # <- jump here
+                Return(),
+            ]
+        }
+    )
+    assert isinstance(exe.machine_code[4], CallBuiltin)
+    assert run_main(exe) == 7
+
+
+def test_function_at():
+    exe = make_exe(
+        {
+            "main": [PushV(TlInt(1)), PushV(TlInt(2)), Return()],
+            "other": [PushV(TlInt(3)), Return()],
+        }
+    )
+    assert exe.function_at(0) == ("#0:main", 0)
+    assert exe.function_at(1) == ("#0:main", 1)
+    assert exe.function_at(3) == ("#1:other", 0)
+    assert exe.function_at(4) == ("#1:other", 1)
+    # The Stop sentinel
+    assert exe.function_at(len(exe.code)) == ("#1:other", 2)
+
+
+def test_function_at_before_first_function():
+    exe = Executable({}, {"#0:main": 1}, [Return(), Return()], {})
+    with pytest.raises(ValueError):
+        exe.function_at(0)
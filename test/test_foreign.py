@@ -0,0 +1,26 @@
+import threading
+
+from hark_lang.machine.foreign import start_capture_stdout, stop_capture_stdout
+
+
+def test_capture_stdout_per_thread():
+    barrier = threading.Barrier(2)
+    results = {}
+
+    def capture(name):
+        start_capture_stdout()
+        try:
+            # Make sure both threads are capturing at the same time
+            barrier.wait()
+            print(f"hello from {name}")
+            barrier.wait()
+        finally:
+            results[name] = stop_capture_stdout()
+
+    threads = [threading.Thread(target=capture, args=(n,)) for n in ("a", "b")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert results == {"a": "hello from a\n", "b": "hello from b\n"}
@@ -0,0 +1,81 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+import hark_lang.load as load
+from hark_lang.machine.instructionset import BindPop, CallBuiltin
+from hark_lang.controllers import local
+from hark_lang.executors import thread as hark_thread
+from hark_lang.run.common import wait_for_finish
+
+EXAMPLES_SUBDIR = Path(__file__).parent / "examples"
+
+
+def setup_module(module):
+    # So that the examples can import their Python code
+    sys.path.append(str(EXAMPLES_SUBDIR))
+
+
+def run_exe(exe, function="main"):
+    """Run a function in EXE locally, and return the controller for inspection"""
+    controller = local.DataController()
+    invoker = hark_thread.Invoker(controller)
+    controller.set_executable(exe)
+    m = controller.toplevel_machine(exe.bindings[function], [])
+    invoker.invoke(m, run_async=False)
+    wait_for_finish(0.1, 10, controller, invoker)
+    return controller
+
+
+def run_example(filename, function):
+    """Run an example function, and return the controller for inspection"""
+    return run_exe(load.compile_file(EXAMPLES_SUBDIR / filename), function)
+
+
+def test_wait_on_list_of_futures():
+    controller = run_example("errors.hk", "wait_on_list")
+    assert controller.broken
+    [failure] = controller.get_failures()
+    assert "Waiting on a list that contains futures!" in failure.error_msg
+
+
+def test_foreign_exit_stops_capture(capfd):
+    with pytest.raises(SystemExit):
+        run_example("errors.hk", "py_exit")
+    # Output written after the foreign function exited must not be captured
+    print("after")
+    assert capfd.readouterr().out.endswith("after\n")
+
+
+def get_events(controller, event):
+    return [e.data for e in controller.get_probe_events() if e.event == event]
+
+
+def test_trace_steps_show_compiled_code(monkeypatch):
+    monkeypatch.setenv("HARK_TRACE_STEPS", "1")
+    controller = run_example("pythonimport.hk", "main")
+    assert not controller.broken
+    steps = get_events(controller, "step")
+    assert steps
+    exe = controller.executable
+    for step in steps:
+        assert step["instr"] == str(exe.code[step["ip"]])
+        assert step["location"] == "%s+%d" % exe.function_at(step["ip"])
+    # The Hark functions (after the foreign function wrappers, which are only
+    # used by async calls) are all called, and there are no branches. So every
+    # instruction in them is traced - none are skipped by super-instructions.
+    ips = {step["ip"] for step in steps}
+    assert ips == set(range(exe.locations["#2:show_format"], len(exe.code)))
+    [stop] = get_events(controller, "stop")
+    assert stop["steps"] == len(steps)
+
+
+def test_steps_counted_without_tracing():
+    controller = run_example("pythonimport.hk", "main")
+    exe = controller.executable
+    # As above, every instruction in the Hark functions runs once. Each
+    # super-instruction counts as the two steps it replaces.
+    assert any(isinstance(i, (BindPop, CallBuiltin)) for i in exe.machine_code)
+    [stop] = get_events(controller, "stop")
+    assert stop["steps"] == len(exe.code) - exe.locations["#2:show_format"]
@@ -0,0 +1,59 @@
+import json
+
+from hark_lang.machine.state import State
+from hark_lang.machine.types import *
+
+
+def fresh_serialise(state: State):
+    """Serialise a copy of STATE that has no cached results"""
+    copy = State(state._ds)
+    copy.bindings = dict(state.bindings)
+    return copy.serialise()
+
+
+def test_round_trip():
+    state = State([TlInt(1), TlList([TlString("a"), TlNull()])])
+    state.bindings["x"] = TlHash({TlString("k"): TlFloat(1.5)})
+    ser = json.loads(json.dumps(state.serialise()))
+    deser = State.deserialise(ser)
+    assert deser == state
+    assert deser.serialise() == ser
+
+    # The deserialised state is resumed and changed, and then saved again
+    deser._ds.append(TlInt(2))
+    deser.bindings["x"] = TlString("x")
+    deser.bindings["y"] = TlNull()
+    ser2 = json.loads(json.dumps(deser.serialise()))
+    assert ser2 == fresh_serialise(deser)
+    assert State.deserialise(ser2) == deser
+
+
+def test_serialise_after_changes():
+    state = State([TlInt(1), TlList([TlString("a"), TlNull()]), TlInt(3)])
+    state.bindings["x"] = TlInt(5)
+    state.bindings["y"] = TlString("y")
+    first = state.serialise()
+
+    # Change the stack below the top, and push
+    state._ds[1] = TlList([TlString("b")])
+    state._ds.append(TlFloat(1.5))
+    # Re-bind, add and remove bindings
+    state.bindings["x"] = TlInt(6)
+    state.bindings["z"] = TlTrue()
+    del state.bindings["y"]
+
+    second = state.serialise()
+    assert second == fresh_serialise(state)
+    assert second != first
+
+    # And back again
+    state._ds.pop()
+    assert state.serialise() == fresh_serialise(state)
+
+
+def test_serialise_result_is_new():
+    state = State([TlInt(1)])
+    first = state.serialise()
+    first["ds"].append(TlInt(2).serialise())
+    first["bindings"]["x"] = TlInt(3).serialise()
+    assert state.serialise() == fresh_serialise(state)